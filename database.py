@@ -1,26 +1,73 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 from sqlalchemy.exc import SQLAlchemyError
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Async drivers for the supported backends; sync URLs are upgraded automatically
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    except SQLAlchemyError as e:
-        db.rollback()
-        raise e
-    finally:
-        db.close()
+# libpq SSL options asyncpg has no keyword for; they need an ssl.SSLContext instead
+UNSUPPORTED_ASYNCPG_QUERY_PARAMS = {"sslcert", "sslkey", "sslrootcert", "sslcrl", "sslpassword"}
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    if backend == "postgresql":
+        unsupported = UNSUPPORTED_ASYNCPG_QUERY_PARAMS & set(parsed.query)
+        if unsupported:
+            raise ValueError(
+                f"DATABASE_URL options {sorted(unsupported)} are not supported by asyncpg; "
+                "remove them or configure SSL certificates on the server side"
+            )
+        # asyncpg takes libpq's sslmode values under the name "ssl"
+        if "sslmode" in parsed.query:
+            sslmode = parsed.query["sslmode"]
+            parsed = parsed.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return parsed.render_as_string(hide_password=False)
 
+DATABASE_URL = to_async_url(os.getenv("DATABASE_URL"))
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+# Development aid: log every SQL statement and pool checkout/checkin
+DEBUG = os.getenv("DEBUG") == "1"
 
+engine_kwargs = {}
+if DEBUG:
+    engine_kwargs.update(echo=True, echo_pool="debug")
+if not DATABASE_URL.startswith("sqlite"):
+    # Pooled connections, checked before use so stale sockets are replaced
+    engine_kwargs.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+if DATABASE_URL.startswith("postgresql"):
+    engine_kwargs["connect_args"] = {
+        "server_settings": {
+            "application_name": "string-analyser-api",
+            "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS),
+        },
+    }
+
+engine = create_async_engine(DATABASE_URL, **engine_kwargs)
+AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+Base = declarative_base()
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise e
@@ -1,14 +1,28 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from database import engine, Base
-from middleware import add_request_id_and_process_time
+from middleware import QUERY_COUNT_CHECK, add_request_id_and_process_time, enable_query_counting
 from logger import get_logger
 from routes import router
 
 logger = get_logger(__name__)
 
-Base.metadata.create_all(bind=engine)
-app = FastAPI(title="String Analysis API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    await engine.dispose()
+
+app = FastAPI(
+    title="String Analysis API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,6 +31,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if QUERY_COUNT_CHECK:
+    enable_query_counting(app)
 app.middleware("http")(add_request_id_and_process_time)
 
 @app.get("/")
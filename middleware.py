@@ -1,11 +1,57 @@
+import os
 import time
 import uuid
+from contextvars import ContextVar
+from typing import Optional
 from fastapi import FastAPI, Request, HTTPException
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from database import DEBUG
 from logger import get_logger
 
 app = FastAPI()
 logger = get_logger(__name__)
 
+# Development-only N+1 detector, on with DEBUG=1 or QUERY_COUNT_CHECK=1.
+# Requests issuing more statements than the threshold are logged as likely N+1 query patterns
+QUERY_COUNT_CHECK = DEBUG or os.getenv("QUERY_COUNT_CHECK") == "1"
+QUERY_COUNT_WARN_THRESHOLD = int(os.getenv("QUERY_COUNT_WARN_THRESHOLD", "10"))
+
+# Mutable holder so counts made inside SQLAlchemy's async greenlets reach the request
+request_query_count: ContextVar[Optional[list]] = ContextVar("request_query_count", default=None)
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = request_query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+async def warn_on_query_count(request: Request, call_next):
+    counter = [0]
+    request_query_count.set(counter)
+    response = await call_next(request)
+    body_iterator = response.body_iterator
+
+    # Streaming responses keep querying after call_next returns, so check once the body is sent
+    async def check_after_body():
+        async for chunk in body_iterator:
+            yield chunk
+        if counter[0] > QUERY_COUNT_WARN_THRESHOLD:
+            logger.warning(
+                f"{request.method} {request.url.path} issued {counter[0]} SQL statements "
+                f"(threshold {QUERY_COUNT_WARN_THRESHOLD}); check for N+1 lazy loads"
+            )
+
+    response.body_iterator = check_after_body()
+    return response
+
+
+def enable_query_counting(app: FastAPI) -> None:
+    """Count SQL statements on every engine and warn per request; call only when QUERY_COUNT_CHECK."""
+    event.listen(Engine, "before_cursor_execute", count_query)
+    app.middleware("http")(warn_on_query_count)
+
 @app.middleware("http")
 async def add_request_id_and_process_time(request: Request, call_next):
     # Generate unique request ID
@@ -1,11 +1,30 @@
 from datetime import datetime, timezone
-from sqlalchemy import JSON, Column, String,  DateTime
+from sqlalchemy import JSON, Boolean, Column, Integer, LargeBinary, String,  DateTime
 from database import Base
 
 class Strings(Base):
     __tablename__ = "strings"
 
-    id = Column(String, primary_key=True, index=True)
-    value = Column(String, index=True, nullable=False)
-    properties = Column(JSON, nullable=False)  # Store as JSON string
-    created_at = Column(DateTime, default=datetime.now(timezone.utc), nullable=False)
\ No newline at end of file
+    id = Column(String, primary_key=True)  # sha256 of value
+    value = Column(String, nullable=False)
+    # Filterable properties live in their own indexed columns
+    length = Column(Integer, index=True, nullable=False)
+    is_palindrome = Column(Boolean, index=True, nullable=False)
+    unique_characters = Column(Integer, index=True, nullable=False)
+    word_count = Column(Integer, index=True, nullable=False)
+    character_frequency_map = Column(JSON, nullable=False)
+    char_bitmap = Column(LargeBinary(16), nullable=True)  # ASCII presence bits, see StringService.character_bitmap
+    # timezone-aware: asyncpg rejects aware datetimes bound to TIMESTAMP WITHOUT TIME ZONE
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    @property
+    def properties(self) -> dict:
+        return {
+            "length": self.length,
+            "is_palindrome": self.is_palindrome,
+            "unique_characters": self.unique_characters,
+            "word_count": self.word_count,
+            "sha256_hash": self.id,  # id is the sha256 of value
+            "character_frequency_map": self.character_frequency_map,
+        }
+
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 
@@ -23,5 +23,4 @@ class StringResponse(BaseModel):
     value: str
     properties: StringProperties
     created_at: str
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
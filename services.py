@@ -1,30 +1,131 @@
 import re
-from typing import Any, Dict, List, Optional
-from fastapi.encoders import jsonable_encoder
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional
 from fastapi import status
 import hashlib
 from collections import Counter
+import numpy as np
+import orjson
+from cachetools import LRUCache, TTLCache
 from datetime import datetime, timezone
 from fastapi import HTTPException
-from schema import StringCreate, StringProperties, StringResponse
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from schema import StringCreate, StringProperties
+from sqlalchemy import Select, and_, delete, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 from logger import get_logger
 from models import Strings
 
 logger = get_logger(__name__)
 
+INSERT_BY_DIALECT = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+# Every phrase natural_language_query understands, as one alternation with a named group each
+NL_QUERY_PATTERN = re.compile(
+    r"(?P<single_word>\b(?:single|one)[- ]word\b)"
+    r"|(?P<palindrome>palindr)"
+    r"|longer than\s+(?P<longer_than>\d+)"
+    r"|containing\s+the\s+letter\s+(?=(?P<containing_letter>[a-z]))"
+    r"|letter\s+(?=(?P<letter>[a-z]))"
+    r"|containing\s+(?=(?P<containing>[a-z])\b)"
+    r"|(?P<first_vowel>first vowel)"
+)
+
+# ASCII presence bitmap stored per row for contains_character filtering
+CHAR_BITMAP_BYTES = 16
+
+# Upper bound on POST /strings/bulk batch size (keeps one INSERT under driver bind-parameter limits)
+BULK_CREATE_MAX_ITEMS = 1000
+
+# Short-lived cache of encoded filter results ({"data": [...], "count": N}) keyed by the filter
+# values, bounded by total bytes. Entries are tagged with the table version they were read at;
+# every committed write bumps the version, so stale entries are never served by this process
+# (other workers see the change within FILTER_CACHE_TTL seconds).
+FILTER_CACHE_TOTAL_BYTES = 32 * 1024 * 1024
+FILTER_CACHE_TTL = 10
+FILTER_CACHE_MAX_BYTES = 1_000_000
+filter_cache: TTLCache = TTLCache(
+    maxsize=FILTER_CACHE_TOTAL_BYTES, ttl=FILTER_CACHE_TTL, getsizeof=lambda entry: len(entry[1])
+)
+strings_version = 0
+
+# Rows fetched from the cursor and encoded per chunk when streaming list responses
+STREAM_BATCH_SIZE = 500
+
+# Memoized analyses, bounded by estimated total bytes (key string + frequency map), not entry count.
+# Measured: ~106 bytes per frequency-map entry for non-ASCII characters, up to 4 bytes per key character.
+ANALYSIS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+ANALYSIS_CACHE_MAX_LENGTH = 4096
+ANALYSIS_CACHE_BYTES_PER_MAP_ENTRY = 128
+ANALYSIS_CACHE_BYTES_PER_ENTRY = 1024
+
+
+def estimated_analysis_size(properties: StringProperties) -> int:
+    return (
+        ANALYSIS_CACHE_BYTES_PER_ENTRY
+        + 4 * properties.length
+        + ANALYSIS_CACHE_BYTES_PER_MAP_ENTRY * len(properties.character_frequency_map)
+    )
+
+
+analysis_cache: LRUCache = LRUCache(maxsize=ANALYSIS_CACHE_MAX_BYTES, getsizeof=estimated_analysis_size)
+# Bulk creates analyze in the threadpool, and LRUCache reorders itself even on reads
+analysis_cache_lock = threading.Lock()
+
+# Below this many bytes Counter beats the numpy call overhead
+BINCOUNT_MIN_LENGTH = 256
+
 
 class StringService:
+    @staticmethod
+    def character_frequency(text: str, encoded: bytes) -> Dict[str, int]:
+        # Long ASCII strings: one byte per character, so a vectorised bincount over the bytes works
+        if len(encoded) >= BINCOUNT_MIN_LENGTH and text.isascii():
+            counts = np.bincount(np.frombuffer(encoded, dtype=np.uint8), minlength=128)
+            present = np.flatnonzero(counts)
+            return dict(zip(map(chr, present.tolist()), counts[present].tolist()))
+        return dict(Counter(text))
+
+    @staticmethod
+    def character_bitmap(character_frequency_map: Dict[str, int]) -> bytes:
+        # One bit per ASCII code point, LSB-first within each byte to match Postgres get_bit()
+        bits = bytearray(CHAR_BITMAP_BYTES)
+        for ch in character_frequency_map:
+            code = ord(ch)
+            if code < 128:
+                bits[code >> 3] |= 1 << (code & 7)
+        return bytes(bits)
+
     @staticmethod
     def analyze_string(text: str) -> StringProperties:
+        # analyze_string is pure, so short values are memoized within analysis_cache's byte budget
+        if len(text) > ANALYSIS_CACHE_MAX_LENGTH:
+            return StringService.compute_analysis(text)
+        with analysis_cache_lock:
+            properties = analysis_cache.get(text)
+        if properties is None:
+            properties = StringService.compute_analysis(text)
+            with analysis_cache_lock:
+                analysis_cache[text] = properties
+        return properties
+
+    @staticmethod
+    def compute_analysis(text: str) -> StringProperties:
+        encoded = text.encode()
+        character_frequency_map = StringService.character_frequency(text, encoded)
         # Normalize for palindrome check
         clean_text = text.strip().lower().replace(" ", "")
         length = len(text)
-        is_palindrome = clean_text == clean_text[::-1]
-        unique_characters = len(set(text))
+        # Compare the first half with the reversed second half, cheapest mismatch (the ends) first
+        half = len(clean_text) // 2
+        is_palindrome = half == 0 or (
+            clean_text[0] == clean_text[-1] and clean_text[:half] == clean_text[:-half - 1:-1]
+        )
+        unique_characters = len(character_frequency_map)
         word_count = len(text.split())
-        sha256_hash = hashlib.sha256(text.encode()).hexdigest()
-        character_frequency_map = dict(Counter(text))
+        sha256_hash = hashlib.sha256(encoded).hexdigest()
 
         return StringProperties(
             length=length,
@@ -36,75 +137,118 @@ class StringService:
         )
 
     @staticmethod
-    def create_string_analysis(db: Session, text: StringCreate) -> StringResponse:
+    def validate_value(value: str) -> None:
         # Check for missing values
-        if not isinstance(text.value, str):
+        if not isinstance(value, str):
             logger.error("String value must be a string")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="String value must be a string")
-        if not text.value.strip():
+        if not value.strip():
             logger.error("String value is required")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="String value is required")
-        existing_entry = db.query(Strings).filter(Strings.value == text.value).first()
-        if existing_entry:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="String already exists")
-        properties = StringService.analyze_string(text.value)
 
-        string_entry = Strings(
-            id=str(hashlib.sha256(text.value.encode()).hexdigest()),
-            value=text.value,
-            properties=jsonable_encoder(properties),
-            created_at=datetime.now(timezone.utc),
-        )
-        db.add(string_entry)
-        db.flush()
-        db.refresh(string_entry)
+    @staticmethod
+    def build_row(value: str, created_at: datetime) -> Dict[str, Any]:
+        properties = StringService.analyze_string(value)
+        return {
+            "id": properties.sha256_hash,  # already computed by analyze_string
+            "value": value,
+            "length": properties.length,
+            "is_palindrome": properties.is_palindrome,
+            "unique_characters": properties.unique_characters,
+            "word_count": properties.word_count,
+            "character_frequency_map": properties.character_frequency_map,
+            "char_bitmap": StringService.character_bitmap(properties.character_frequency_map),
+            "created_at": created_at,
+        }
+
+    @staticmethod
+    def build_rows(texts: List[StringCreate], created_at: datetime) -> List[Dict[str, Any]]:
+        # Keyed by id so a value repeated within the batch is inserted once
+        rows: Dict[str, Dict[str, Any]] = {}
+        for text in texts:
+            row = StringService.build_row(text.value, created_at)
+            rows.setdefault(row["id"], row)
+        return list(rows.values())
+
+    @staticmethod
+    async def create_string_analysis(db: AsyncSession, text: StringCreate) -> Dict[str, Any]:
+        StringService.validate_value(text.value)
+        row = StringService.build_row(text.value, datetime.now(timezone.utc))
+
+        # Single INSERT ... ON CONFLICT DO NOTHING; no returned row means the id (sha256 of value) exists
+        insert = INSERT_BY_DIALECT[db.get_bind().dialect.name]
+        stmt = insert(Strings).values(**row).on_conflict_do_nothing(index_elements=[Strings.id]).returning(Strings)
+        result = await db.execute(stmt)
+        string_entry = result.scalars().first()
+        if string_entry is None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="String already exists")
         logger.info(f"String analysis created with ID: {string_entry.id}")
-        return StringResponse(
-            id=string_entry.id,
-            value=string_entry.value,
-            properties=string_entry.properties,
-            created_at=string_entry.created_at.isoformat(),
+        return StringService.entry_to_dict(string_entry)
+
+    @staticmethod
+    async def create_string_analyses(db: AsyncSession, texts: List[StringCreate]) -> Dict[str, Any]:
+        """
+        Analyze and store many strings with one multi-row INSERT.
+         Values that already exist (or repeat within the batch) are skipped rather than rejected.
+        """
+        if not texts:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one string is required")
+        if len(texts) > BULK_CREATE_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {BULK_CREATE_MAX_ITEMS} strings can be created per request",
+            )
+        for text in texts:
+            StringService.validate_value(text.value)
+
+        # Analyzing up to BULK_CREATE_MAX_ITEMS values is CPU-bound; keep it off the event loop
+        rows = await run_in_threadpool(StringService.build_rows, texts, datetime.now(timezone.utc))
+
+        insert = INSERT_BY_DIALECT[db.get_bind().dialect.name]
+        stmt = (
+            insert(Strings)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[Strings.id])
+            .returning(Strings)
         )
+        result = await db.execute(stmt)
+        data = [StringService.entry_to_dict(e) for e in result.scalars().all()]
+        logger.info(f"Bulk created {len(data)} string analyses, skipped {len(texts) - len(data)}")
+        return {
+            "data": data,
+            "count": len(data),
+            "skipped": len(texts) - len(data),
+        }
 
     @staticmethod
-    def get_string_response(db: Session, string_value: str) -> StringResponse:
-        string_entry = db.query(Strings).filter(Strings.value == string_value).first()
+    def string_id(string_value: str) -> str:
+        # Rows are keyed by the sha256 of their value, so lookups by value go through the primary key
+        return hashlib.sha256(string_value.encode()).hexdigest()
+
+    @staticmethod
+    async def get_string_response(db: AsyncSession, string_value: str) -> Dict[str, Any]:
+        string_entry = await db.get(Strings, StringService.string_id(string_value))
         if not string_entry:
             raise HTTPException(status_code=404, detail="String not found")
-        return StringResponse(
-            id=string_entry.id,
-            value=string_entry.value,
-            properties=string_entry.properties,
-            created_at=string_entry.created_at.isoformat(),
-        )
+        return StringService.entry_to_dict(string_entry)
 
     @staticmethod
-    async def get_all_strings(db: Session) -> list[StringResponse]:
-        string_entries = db.query(Strings).all()
-        responses = [
-            StringResponse(
-                id=entry.id,
-                value=entry.value,
-                properties=entry.properties,
-                created_at=entry.created_at.isoformat(),
-            )
-            for entry in string_entries
-        ]
-        return jsonable_encoder(responses)
+    async def get_all_strings(db: AsyncSession) -> list[Dict[str, Any]]:
+        result = await db.execute(select(Strings))
+        return [StringService.entry_to_dict(entry) for entry in result.scalars().all()]
 
     @staticmethod
-    def filter_strings(
-        db: Session,
+    def filter_query(
+        db: AsyncSession,
         is_palindrome: Optional[bool] = None,
         min_length: Optional[int] = None,
         max_length: Optional[int] = None,
         word_count: Optional[int] = None,
         contains_character: Optional[str] = None,
-    ) -> List[Dict[str, Any]]:
+    ) -> Select:
         """
-        Apply query-parameter filters to filter stored string entries.
+        Build the SELECT for the given query-parameter filters.
          Validates incoming filter values and raises HTTPException(400) for invalid types/values.
-         Returns a JSON-serializable list of StringResponse objects (encoded via jsonable_encoder).
         """
         # Validate parameter types/values
         try:
@@ -155,37 +299,131 @@ class StringService:
                 status_code=400, detail="Invalid query parameter values or types"
             )
 
-        entries = db.query(Strings).all()
-        filtered_objs: List[StringResponse] = []
-        for e in entries:
-            props = e.properties or {}
-            p_length = props.get("length")
-            p_is_pal = props.get("is_palindrome")
-            p_word_count = props.get("word_count")
-
-            # apply filters
-            if is_palindrome is not None and p_is_pal != is_palindrome:
-                continue
-            if min_length is not None and (p_length is None or p_length < min_length):
-                continue
-            if max_length is not None and (p_length is None or p_length > max_length):
-                continue
-            if word_count is not None and p_word_count != word_count:
-                continue
-            if contains_character is not None:
-                if contains_character not in (e.value or ""):
-                    continue
-
-            filtered_objs.append(
-                StringResponse(
-                    id=e.id,
-                    value=e.value,
-                    properties=e.properties,
-                    created_at=e.created_at.isoformat(),
+        stmt = select(Strings)
+        if is_palindrome is not None:
+            stmt = stmt.where(Strings.is_palindrome == is_palindrome)
+        if min_length is not None:
+            stmt = stmt.where(Strings.length >= min_length)
+        if max_length is not None:
+            stmt = stmt.where(Strings.length <= max_length)
+        if word_count is not None:
+            stmt = stmt.where(Strings.word_count == word_count)
+        if contains_character is not None:
+            # autoescape makes "%" and "_" match literally
+            contains = Strings.value.contains(contains_character, autoescape=True)
+            if ord(contains_character) < 128 and db.get_bind().dialect.name == "postgresql":
+                # O(1) bit test per row; rows stored before char_bitmap existed fall back to LIKE
+                contains = or_(
+                    func.get_bit(Strings.char_bitmap, ord(contains_character)) == 1,
+                    and_(Strings.char_bitmap.is_(None), contains),
                 )
-            )
+            stmt = stmt.where(contains)
+
+        return stmt
+
+    @staticmethod
+    async def stream_strings(result: AsyncResult) -> AsyncIterator[bytes]:
+        """
+        Encode an open streaming result as the unterminated JSON object {"data": [...], "count": N,
+        fetching and encoding STREAM_BATCH_SIZE rows at a time.
+        """
+        yield b'{"data":['
+        count = 0
+        async for batch in result.scalars().partitions():
+            chunk = b",".join(orjson.dumps(StringService.entry_to_dict(e)) for e in batch)
+            yield chunk if count == 0 else b"," + chunk
+            count += len(batch)
+        yield b'],"count":' + str(count).encode()
+
+    @staticmethod
+    async def list_response(
+        db: AsyncSession, stmt: Select, cache_key: tuple, extra: Dict[str, Any]
+    ) -> AsyncIterator[bytes]:
+        """
+        Full { data, count, **extra } body: data and count come from the filter cache or the
+        database, extra is appended per request so it never has to be part of the cache key.
+        The query is started here, before any bytes are sent, so its errors still reach the route.
+        """
+        cached = StringService.get_cached_response(cache_key)
+        if cached is not None:
+            data: AsyncIterator[bytes] = StringService.single_chunk(cached)
+        else:
+            version = strings_version
+            result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+            data = StringService.cache_stream(cache_key, version, StringService.stream_strings(result))
+        return StringService.append_extra(data, extra)
+
+    @staticmethod
+    async def single_chunk(chunk: bytes) -> AsyncIterator[bytes]:
+        yield chunk
+
+    @staticmethod
+    async def append_extra(data: AsyncIterator[bytes], extra: Dict[str, Any]) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in data:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent, so the route can no longer turn this into a 500
+            logger.error(f"Error while streaming strings: {e}")
+            raise
+        # extra's opening brace is replaced by a comma; its closing brace ends the document
+        yield b"," + orjson.dumps(extra)[1:]
+
+    @staticmethod
+    def invalidate_cached_responses() -> None:
+        """Call after committing a write to the strings table."""
+        global strings_version
+        strings_version += 1
+
+    @staticmethod
+    def get_cached_response(key: tuple) -> Optional[bytes]:
+        cached = filter_cache.get(key)
+        if cached is not None and cached[0] == strings_version:
+            return cached[1]
+        return None
+
+    @staticmethod
+    async def cache_stream(key: tuple, version: int, stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Pass stream through unchanged, caching its bytes under key (read at version) if they stay small."""
+        chunks: Optional[list] = []
+        size = 0
+        async for chunk in stream:
+            yield chunk
+            if chunks is not None:
+                size += len(chunk)
+                if size > FILTER_CACHE_MAX_BYTES:
+                    chunks = None
+                else:
+                    chunks.append(chunk)
+        if chunks is not None:
+            filter_cache[key] = (version, b"".join(chunks))
 
-        data = jsonable_encoder(filtered_objs)
+    @staticmethod
+    def entry_to_dict(entry: Strings) -> Dict[str, Any]:
+        return {
+            "id": entry.id,
+            "value": entry.value,
+            "properties": entry.properties,
+            "created_at": entry.created_at.isoformat(),
+        }
+
+    @staticmethod
+    async def filter_strings(
+        db: AsyncSession,
+        is_palindrome: Optional[bool] = None,
+        min_length: Optional[int] = None,
+        max_length: Optional[int] = None,
+        word_count: Optional[int] = None,
+        contains_character: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Apply query-parameter filters to filter stored string entries.
+         Raises HTTPException(400) up front for invalid filters, then returns a stream of
+         the { data, count, filters_applied } response body.
+        """
+        stmt = StringService.filter_query(
+            db, is_palindrome, min_length, max_length, word_count, contains_character
+        )
         filters_applied = {
             "is_palindrome": is_palindrome,
             "min_length": min_length,
@@ -193,17 +431,14 @@ class StringService:
             "word_count": word_count,
             "contains_character": contains_character,
         }
-
-        return {
-            "data": data, 
-            "count": len(data),
-            "filters_applied": filters_applied
-            }
+        cache_key = tuple(filters_applied.values())
+        return await StringService.list_response(db, stmt, cache_key, {"filters_applied": filters_applied})
 
     @staticmethod
-    def natural_language_query(db: Session, query: str) -> Dict[str, Any]:
+    async def natural_language_query(db: AsyncSession, query: str) -> AsyncIterator[bytes]:
         """
-        Parse a natural language query string into filter parameters.
+        Parse a natural language query string into filter parameters and return
+        a stream of the matching strings.
         """
         if not query or not query.strip():
             raise HTTPException(status_code=400, detail="Unable to parse natural language query")
@@ -211,37 +446,31 @@ class StringService:
         q = query.lower()
         parsed: Dict[str, Any] = {}
 
+        # One scan collects the first match of every pattern; letter captures sit in
+        # lookaheads so they don't consume text another pattern may need
+        found: Dict[str, str] = {}
+        for match in NL_QUERY_PATTERN.finditer(q):
+            found.setdefault(match.lastgroup, match.group(match.lastgroup))
+
         # single word / one word
-        if re.search(r"\bsingle[- ]word\b", q) or re.search(r"\bone[- ]word\b", q):
+        if "single_word" in found:
             parsed["word_count"] = 1
 
         # palindrome
-        if "palindr" in q:
+        if "palindrome" in found:
             parsed["is_palindrome"] = True
 
         # longer than N characters -> treat as min_length = N+1
-        m = re.search(r"longer than\s+(\d+)", q)
-        if m:
-            n = int(m.group(1))
-            parsed["min_length"] = n + 1
-
-        # containing the letter X (generic)
-        m2 = re.search(r"letter\s+([a-z])", q)
-        if m2:
-            parsed["contains_character"] = m2.group(1)
-
-        # "containing the letter X"
-        m3 = re.search(r"containing\s+the\s+letter\s+([a-z])", q)
-        if m3:
-            parsed["contains_character"] = m3.group(1)
-
-        # "strings containing the letter z" or "containing z"
-        m4 = re.search(r"containing\s+([a-z])\b", q)
-        if not parsed.get("contains_character") and m4:
-            parsed["contains_character"] = m4.group(1)
+        if "longer_than" in found:
+            parsed["min_length"] = int(found["longer_than"]) + 1
+
+        # "containing the letter X" beats "letter X", which beats "containing X"
+        character = found.get("containing_letter") or found.get("letter") or found.get("containing")
+        if character:
+            parsed["contains_character"] = character
 
         # first vowel heuristic
-        if "first vowel" in q:
+        if "first_vowel" in found:
             parsed["contains_character"] = parsed.get("contains_character", "a")
 
         # Basic conflict detection (if both min and max were parsed somehow)
@@ -253,8 +482,8 @@ class StringService:
             # could not interpret the query
             raise HTTPException(status_code=400, detail="Unable to parse natural language query")
 
-        # Apply parsed filters using existing filter_strings method
-        results = StringService.filter_strings(
+        # Apply parsed filters using the same query builder as filter_strings
+        stmt = StringService.filter_query(
             db,
             is_palindrome=parsed.get("is_palindrome"),
             min_length=parsed.get("min_length"),
@@ -263,24 +492,27 @@ class StringService:
             contains_character=parsed.get("contains_character"),
         )
 
-        # results from filter_strings already has shape { data, count, filters_applied }
-        return {
-            "data": results.get("data"),
-            "count": results.get("count"),
-            "interpreted_query": {
-                "original": query,
-                "parsed_filters": parsed,
-            },
+        # streamed body has shape { data, count, interpreted_query }
+        interpreted_query = {
+            "original": query,
+            "parsed_filters": parsed,
         }
+        # Keyed on the parsed filters (same key as filter_strings), never on the raw query text
+        cache_key = (
+            parsed.get("is_palindrome"),
+            parsed.get("min_length"),
+            parsed.get("max_length"),
+            parsed.get("word_count"),
+            parsed.get("contains_character"),
+        )
+        return await StringService.list_response(db, stmt, cache_key, {"interpreted_query": interpreted_query})
        
 
     @staticmethod
-    def delete_string(db: Session, string_value: str) -> None:
-        string_entry = db.query(Strings).filter(Strings.value == string_value).first()
-        if not string_entry:
+    async def delete_string(db: AsyncSession, string_value: str) -> None:
+        result = await db.execute(delete(Strings).where(Strings.id == StringService.string_id(string_value)))
+        if result.rowcount == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="String not found")
-        db.delete(string_entry)
-        db.flush()
         logger.info(f"String with value '{string_value}' deleted successfully.")
         return
 
@@ -1,36 +1,45 @@
+import asyncio
+import logging
+import os
+
+# Turn on the development-only SQL statement counter before the app is imported
+os.environ.setdefault("QUERY_COUNT_CHECK", "1")
+
 from fastapi.testclient import TestClient
 import pytest
 import models  
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.pool import StaticPool
-from sqlalchemy.orm import sessionmaker
 
-from database import Base, get_db
+from database import Base, get_db, to_async_url
 from main import app
+from services import BULK_CREATE_MAX_ITEMS, StringService
 
 
-SQLITE_URL = "sqlite:///:memory:"
+SQLITE_URL = "sqlite+aiosqlite:///:memory:"
 
 
 @pytest.fixture(scope="module")
 def client():
 	# create a new in-memory database and override get_db
-	engine = create_engine(
+	engine = create_async_engine(
 		SQLITE_URL,
 		connect_args={"check_same_thread": False},
 		poolclass=StaticPool,
 	)
-	TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+	TestingSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
 	# create tables on the testing engine
-	Base.metadata.create_all(bind=engine)
+	async def create_tables():
+		async with engine.begin() as conn:
+			await conn.run_sync(Base.metadata.create_all)
+
+	asyncio.run(create_tables())
 
 	# dependency override
-	def override_get_db():
-		db = TestingSessionLocal()
-		try:
+	async def override_get_db():
+		async with TestingSessionLocal() as db:
 			yield db
-		finally:
-			db.close()
 
 	app.dependency_overrides[get_db] = override_get_db
 
@@ -102,6 +111,16 @@ def test_natural_language_filter_success_and_errors(client):
 	assert r_bad.status_code == 400
 
 
+def test_natural_language_route_not_shadowed_by_string_lookup(client):
+	client.post("/strings/", json={"value": "level"})
+	r = client.get("/strings/filter-by-natural-language", params={"query": "palindromic strings"})
+	assert r.status_code == 200
+	body = r.json()
+	assert body["interpreted_query"]["parsed_filters"] == {"is_palindrome": True}
+	assert "level" in [d["value"] for d in body["data"]]
+	assert body["count"] == len(body["data"])
+
+
 def test_delete_string_flow(client):
 	client.post("/strings/", json={"value": "deletethis"})
 	r = client.delete("/strings/deletethis")
@@ -109,6 +128,185 @@ def test_delete_string_flow(client):
 	# confirm gone
 	r2 = client.get("/strings/deletethis")
 	assert r2.status_code == 404
+	# deleting again finds nothing
+	r3 = client.delete("/strings/deletethis")
+	assert r3.status_code == 404
 	
 
 
+def test_filter_contains_character_is_literal(client):
+	client.post("/strings/", json={"value": "100% sure"})
+	r = client.get("/strings", params={"contains_character": "%"})
+	assert r.status_code == 200
+	values = [d["value"] for d in r.json()["data"]]
+	assert values == ["100% sure"]
+
+	r2 = client.get("/strings", params={"is_palindrome": True, "max_length": 7})
+	assert r2.status_code == 200
+	assert all(d["properties"]["is_palindrome"] for d in r2.json()["data"])
+	assert all(d["properties"]["length"] <= 7 for d in r2.json()["data"])
+
+
+def test_long_ascii_string_frequency_map(client):
+	value = "ab c" * 100
+	r = client.post("/strings/", json={"value": value})
+	assert r.status_code == 201
+	props = r.json()["properties"]
+	assert props["character_frequency_map"] == {"a": 100, "b": 100, " ": 100, "c": 100}
+	assert props["unique_characters"] == 4
+
+
+def test_bulk_create_skips_existing_and_repeated_values(client):
+	client.post("/strings/", json={"value": "already here"})
+	r = client.post(
+		"/strings/bulk",
+		json=[{"value": "bulk one"}, {"value": "bulk two"}, {"value": "bulk one"}, {"value": "already here"}],
+	)
+	assert r.status_code == 201
+	body = r.json()
+	assert sorted(d["value"] for d in body["data"]) == ["bulk one", "bulk two"]
+	assert body["count"] == 2 and body["skipped"] == 2
+	assert client.get("/strings/bulk two").status_code == 200
+
+	r_bad = client.post("/strings/bulk", json=[{"value": "fine"}, {"value": "  "}])
+	assert r_bad.status_code == 400
+	assert client.get("/strings/fine").status_code == 404
+
+	# the size cap is enforced by the request model, before any value is analyzed
+	r_big = client.post("/strings/bulk", json=[{"value": f"v{i}"} for i in range(BULK_CREATE_MAX_ITEMS + 1)])
+	assert r_big.status_code == 422
+
+
+def test_filter_results_reflect_writes(client):
+	params = {"contains_character": "q", "min_length": 20}
+	assert client.get("/strings", params=params).json()["count"] == 0
+	# repeated read is served from cache
+	assert client.get("/strings", params=params).json()["count"] == 0
+
+	client.post("/strings/", json={"value": "quite a long sentence here"})
+	assert client.get("/strings", params=params).json()["count"] == 1
+
+	client.delete("/strings/quite a long sentence here")
+	assert client.get("/strings", params=params).json()["count"] == 0
+
+
+def test_single_string_response_shape(client):
+	client.post("/strings/", json={"value": "Step on no pets"})
+	r = client.get("/strings/Step on no pets")
+	assert r.status_code == 200
+	body = r.json()
+	assert set(body) == {"id", "value", "properties", "created_at"}
+	assert body["properties"]["sha256_hash"] == body["id"]
+	assert body["properties"]["is_palindrome"] is True
+	assert body["properties"]["word_count"] == 4
+
+
+def test_filtering_issues_no_query_count_warning(client, caplog):
+	for value in ("alpha beta", "gamma", "delta epsilon zeta"):
+		client.post("/strings/", json={"value": value})
+	with caplog.at_level(logging.WARNING, logger="middleware"):
+		r = client.get("/strings", params={"min_length": 1, "word_count": 2})
+		assert r.status_code == 200
+		assert r.json()["count"] >= 1
+	assert not [rec for rec in caplog.records if "SQL statements" in rec.getMessage()]
+
+
+def test_query_count_warning_fires_over_threshold(client, caplog, monkeypatch):
+	import middleware
+
+	monkeypatch.setattr(middleware, "QUERY_COUNT_WARN_THRESHOLD", 0)
+	with caplog.at_level(logging.WARNING, logger="middleware"):
+		r = client.post("/strings/", json={"value": "counted query"})
+		assert r.status_code == 201
+	assert [rec for rec in caplog.records if "issued 1 SQL statements" in rec.getMessage()]
+
+
+def test_insert_binds_aware_created_at_for_asyncpg():
+	from datetime import datetime, timezone
+	from sqlalchemy.dialects.postgresql import asyncpg, insert
+
+	row = StringService.build_row("timestamp check", datetime.now(timezone.utc))
+	compiled = insert(models.Strings).values(**row).compile(dialect=asyncpg.dialect())
+	# asyncpg can only encode an aware datetime into a timestamptz parameter
+	assert "::TIMESTAMP WITH TIME ZONE" in str(compiled)
+	assert compiled.params["created_at"].tzinfo is not None
+
+
+def test_to_async_url_translates_sslmode_for_asyncpg():
+	url = to_async_url("postgresql://u:p@db.example.com:5432/app?sslmode=require")
+	assert url == "postgresql+asyncpg://u:p@db.example.com:5432/app?ssl=require"
+	assert to_async_url("sqlite:///./dev.db") == "sqlite+aiosqlite:///./dev.db"
+
+	with pytest.raises(ValueError):
+		to_async_url("postgresql://u:p@db/app?sslmode=verify-full&sslrootcert=/etc/ca.pem")
+
+
+def test_analysis_cache_size_estimate_covers_worst_case():
+	import sys
+	import tracemalloc
+	import services
+
+	# 4096 distinct CJK characters: the largest frequency map a cacheable value can produce
+	value = "".join(chr(0x4E00 + i) for i in range(services.ANALYSIS_CACHE_MAX_LENGTH))
+	tracemalloc.start()
+	properties = StringService.compute_analysis(value)
+	allocated, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	assert services.estimated_analysis_size(properties) >= allocated + sys.getsizeof(value)
+
+	StringService.analyze_string(value)
+	assert services.analysis_cache.currsize <= services.ANALYSIS_CACHE_MAX_BYTES
+
+
+def test_natural_language_cache_keeps_per_query_text(client):
+	client.post("/strings/", json={"value": "kayak"})
+	first = client.get("/strings/filter-by-natural-language", params={"query": "palindromes please"}).json()
+	second = client.get("/strings/filter-by-natural-language", params={"query": "show palindromic ones"}).json()
+	assert first["data"] == second["data"]
+	assert second["interpreted_query"]["original"] == "show palindromic ones"
+
+	import services
+	# keyed on the parsed filters, not the raw query text
+	assert (True, None, None, None, None) in services.filter_cache
+	assert services.filter_cache.currsize <= services.FILTER_CACHE_TOTAL_BYTES
+
+
+def test_filter_query_failure_returns_500_before_streaming(client, monkeypatch):
+	from sqlalchemy.exc import OperationalError
+	from sqlalchemy.ext.asyncio import AsyncSession
+
+	async def failing_stream(self, *args, **kwargs):
+		raise OperationalError("SELECT", {}, Exception("canceling statement due to statement timeout"))
+
+	monkeypatch.setattr(AsyncSession, "stream", failing_stream)
+	# a filter combination no other test uses, so the response cache cannot answer it
+	r = client.get("/strings", params={"min_length": 987654})
+	assert r.status_code == 500
+	assert r.json() == {"detail": "Internal Server Error"}
+
+
+def test_character_bitmap_matches_postgres_get_bit_layout():
+	bitmap = StringService.character_bitmap({"%": 1, "\x7f": 1})
+	assert len(bitmap) == 16
+	# get_bit(bytes, n) reads bit n % 8 of byte n // 8, least significant bit first
+	assert bitmap[4] == 1 << 5  # "%" is 0x25
+	assert bitmap[15] == 1 << 7
+	assert sum(bitmap) == bitmap[4] + bitmap[15]
+	# non-ASCII characters have no bit and fall back to LIKE
+	assert StringService.character_bitmap({"é": 1}) == bytes(16)
+
+
+def test_contains_character_compiles_to_bit_test_on_postgres():
+	from types import SimpleNamespace
+	from sqlalchemy.dialects import postgresql
+
+	db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="postgresql")))
+	stmt = StringService.filter_query(db, contains_character="a")
+	compiled = stmt.compile(dialect=postgresql.dialect())
+	sql = " ".join(str(compiled).split())
+	# AND binds tighter than OR, so rows without a bitmap are the only ones that reach LIKE
+	assert (
+		"WHERE get_bit(strings.char_bitmap, %(get_bit_1)s) = %(get_bit_2)s "
+		"OR strings.char_bitmap IS NULL AND (strings.value LIKE"
+	) in sql
+	assert compiled.params["get_bit_1"] == ord("a") and compiled.params["get_bit_2"] == 1